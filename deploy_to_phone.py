@@ -3,8 +3,52 @@
 用法: python deploy_to_phone.py
 """
 
+import shutil
+import subprocess
 import sys
 
+# 各 provider 的默认模型
+_MODEL_DEFAULTS = {
+    "deepseek": "deepseek-chat",
+    "glm": "glm-4-plus",
+    "minimax": "MiniMax-Text-01",
+    "moonshot": "moonshot-v1-8k",
+    "dashscope": "qwen-max",
+    "doubao": "doubao-pro-256k",
+    "spark": "generalv3.5",
+    "baichuan": "Baichuan4",
+    "yi": "yi-large",
+    "stepfun": "step-2-16k",
+    "openai": "gpt-4o",
+    "openrouter": "anthropic/claude-opus-4-5",
+}
+
+# pyperclip 不可用时按顺序尝试的剪贴板命令 (Windows / macOS / Linux)
+_CLIPBOARD_COMMANDS = (
+    ["clip"],
+    ["pbcopy"],
+    ["xclip", "-selection", "clipboard"],
+)
+
+
+def _copy_to_clipboard(text: str) -> bool:
+    """复制到剪贴板，优先用 pyperclip (无需起子进程)，否则找可用的系统命令。"""
+    try:
+        import pyperclip
+        pyperclip.copy(text)
+        return True
+    except Exception:
+        pass
+
+    for cmd in _CLIPBOARD_COMMANDS:
+        if shutil.which(cmd[0]):
+            try:
+                subprocess.run(cmd, input=text.encode(), check=True)
+                return True
+            except (OSError, subprocess.CalledProcessError):
+                continue
+    return False
+
 
 def main():
     print("🤖 OpenClaw Bot - 生成手机部署命令")
@@ -22,21 +66,7 @@ def main():
         sys.exit(1)
 
     provider = input("Provider [deepseek]: ").strip() or "deepseek"
-    model_defaults = {
-        "deepseek": "deepseek-chat",
-        "glm": "glm-4-plus",
-        "minimax": "MiniMax-Text-01",
-        "moonshot": "moonshot-v1-8k",
-        "dashscope": "qwen-max",
-        "doubao": "doubao-pro-256k",
-        "spark": "generalv3.5",
-        "baichuan": "Baichuan4",
-        "yi": "yi-large",
-        "stepfun": "step-2-16k",
-        "openai": "gpt-4o",
-        "openrouter": "anthropic/claude-opus-4-5",
-    }
-    default_model = model_defaults.get(provider, "deepseek-chat")
+    default_model = _MODEL_DEFAULTS.get(provider.lower(), "deepseek-chat")
     model = input(f"Model [{default_model}]: ").strip() or default_model
     tg_token = input("Telegram Bot Token (可选, 回车跳过): ").strip()
 
@@ -69,11 +99,9 @@ def main():
     print()
 
     # 复制到剪贴板
-    try:
-        import subprocess
-        subprocess.run(["clip"], input=curl_cmd.encode(), check=True)
+    if _copy_to_clipboard(curl_cmd):
         print("✅ 方式一的命令已复制到剪贴板！直接去手机 Termux 粘贴即可。")
-    except Exception:
+    else:
         print("💡 手动复制上面的命令到手机 Termux 中粘贴运行。")
 
 
@@ -1,15 +1,79 @@
 """Core agent engine: connects to LLM, orchestrates tool calls in a loop."""
 
+import asyncio
+import functools
+import hashlib
 import json
-from openai import OpenAI
-from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
-
-from openclaw.config import Config
-from openclaw.tools import TOOLS_SCHEMA, ToolExecutor
-
-console = Console()
+import logging
+import os
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+from openclaw.config import RuntimeConfig, get_config_dir
+from openclaw.tools import TOOLS_SCHEMA, TOOLS_SCHEMA_JSON, FileCache, ToolExecutor
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from rich.console import Console
+
+logger = logging.getLogger(__name__)
+
+# Tools without side effects; consecutive calls to these run concurrently
+PARALLEL_SAFE_TOOLS = frozenset({"read_file", "list_dir", "search_code", "recall"})
+
+# History packing: once the conversation exceeds HISTORY_CHAR_LIMIT characters,
+# older tool results are cut down to head/tail excerpts of ELIDE_KEEP characters.
+# The newest KEEP_RECENT_RESULTS results are always sent verbatim.
+HISTORY_CHAR_LIMIT = 60_000
+KEEP_RECENT_RESULTS = 4
+ELIDE_KEEP = 400
+
+RECALL_TOOL_SCHEMA = {
+    "type": "function",
+    "function": {
+        "name": "recall",
+        "description": "Fetch the full text of an earlier tool result that was elided from the conversation to save context.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "description": "The id shown in the elision marker (cached id=...)"},
+            },
+            "required": ["id"],
+        },
+    },
+}
+
+AGENT_TOOLS = TOOLS_SCHEMA + [RECALL_TOOL_SCHEMA]
+
+# OpenAI-compatible endpoints by provider name; config.llm.api_base overrides
+_PROVIDER_BASE_URLS = {
+    # 国际
+    "openai": "https://api.openai.com/v1",
+    "openrouter": "https://openrouter.ai/api/v1",
+    # 国产
+    "deepseek": "https://api.deepseek.com",
+    "glm": "https://open.bigmodel.cn/api/paas/v4",             # 智谱GLM
+    "minimax": "https://api.minimax.chat/v1",                   # MiniMax
+    "moonshot": "https://api.moonshot.cn/v1",                   # Moonshot/Kimi
+    "dashscope": "https://dashscope.aliyuncs.com/compatible-mode/v1",  # 阿里通义千问
+    "doubao": "https://ark.cn-beijing.volces.com/api/v3",       # 字节豆包(火山引擎)
+    "spark": "https://spark-api-open.xf-yun.com/v1",            # 讯飞星火
+    "baichuan": "https://api.baichuan-ai.com/v1",               # 百川
+    "yi": "https://api.lingyiwanwu.com/v1",                     # 零一万物
+    "stepfun": "https://api.stepfun.com/v1",                    # 阶跃星辰
+}
+
+# Upper bound on tool calls running at once within a parallel batch
+TOOL_CONCURRENCY = int(os.environ.get("OPENCLAW_TOOL_CONCURRENCY", "8"))
+
+# Clients are reused across runs on the same event loop so TLS sessions and
+# keep-alive connections survive between turns
+_CLIENT_CACHE: dict[tuple[str, str], tuple[asyncio.AbstractEventLoop, "AsyncOpenAI"]] = {}
 
 SYSTEM_PROMPT = """\
 You are OpenClaw, an autonomous coding agent. You operate on a real codebase.
@@ -37,145 +101,407 @@ Your job is to fulfill the user's request by reading, writing, and modifying cod
 - Be thorough but efficient. Read what you need, change what you need, verify, done.
 """
 
+# The system message and tool schema form the request prefix providers cache.
+# They are built once and reused as-is so every request starts with identical bytes.
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Providers that only cache when the prefix is marked explicitly (Anthropic models)
+_EXPLICIT_CACHE_PROVIDERS = frozenset({"openrouter", "anthropic"})
+_CACHED_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+}
+
+# Fingerprint of the cacheable prefix, logged per run so a change that busts
+# provider caches shows up when comparing logs across versions
+PROMPT_PREFIX_SHA1 = hashlib.sha1(
+    "\0".join(
+        [SYSTEM_PROMPT, TOOLS_SCHEMA_JSON, json.dumps(RECALL_TOOL_SCHEMA, separators=(",", ":"), ensure_ascii=False)]
+    ).encode("utf-8")
+).hexdigest()
+
+
+@functools.cache
+def _get_console() -> "Console":
+    """Shared rich console, created on first use so importing the agent stays cheap."""
+    from rich.console import Console
+    return Console()
+
+
+@functools.lru_cache(maxsize=8)
+def _get_executor(root: str) -> ToolExecutor:
+    """Shared ToolExecutor per project root, so its caches persist across runs."""
+    return ToolExecutor(root)
+
+
+def _head_lines(content: str, n: int) -> str:
+    """
+    First n lines of content, plus a count of the lines left out.
+
+    Scans for the n-th newline instead of splitting, so a multi-megabyte tool
+    result costs one bounded search and one C-level count.
+    """
+    cut = -1
+    for _ in range(n):
+        cut = content.find("\n", cut + 1)
+        if cut == -1:
+            return content[:-1] if content.endswith("\n") else content
+
+    extra = content.count("\n", cut + 1) + (0 if content.endswith("\n") else 1)
+    if not extra:
+        return content[:cut]
+    return content[:cut] + f"\n  ... ({extra} more lines)"
+
+
+def _build_client(config: RuntimeConfig) -> "AsyncOpenAI":
+    """Return the OpenAI-compatible client for the provider config, creating it on first use."""
+    api_base = config.llm.api_base or _PROVIDER_BASE_URLS.get(
+        config.llm.provider.lower(), _PROVIDER_BASE_URLS["openai"],
+    )
+
+    # Async connection pools are bound to the loop that opened them
+    loop = asyncio.get_running_loop()
+    key = (config.llm.api_key, api_base)
+    cached = _CLIENT_CACHE.get(key)
+    if cached is not None and cached[0] is loop:
+        return cached[1]
+
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(
+        http2=find_spec("h2") is not None,  # HTTP/2 needs the optional h2 package
+        limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=60),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+        follow_redirects=True,
+    )
+    client = AsyncOpenAI(api_key=config.llm.api_key, base_url=api_base, http_client=http_client)
+    _CLIENT_CACHE[key] = (loop, client)
+    return client
+
+
+async def _stream_completion(client: "AsyncOpenAI", config: RuntimeConfig, messages: list[dict], emit) -> tuple[dict, int]:
+    """
+    Request one completion with streaming and assemble the assistant message.
+
+    Text deltas are emitted as ``assistant_delta`` while they arrive; tool call
+    fragments are merged by index and only materialized once the stream ends.
+
+    Returns:
+        (assistant message dict ready to be appended to the history,
+         prompt tokens reported by the provider or 0 if it sent no usage)
+    """
+    response = await client.chat.completions.create(
+        model=config.llm.model,
+        messages=messages,
+        tools=AGENT_TOOLS,
+        tool_choice="auto",
+        max_tokens=config.llm.max_tokens,
+        temperature=config.llm.temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    content_parts = []
+    calls: dict[int, dict] = {}
+    prompt_tokens = 0
+    async for chunk in response:
+        if chunk.usage:
+            prompt_tokens = chunk.usage.prompt_tokens or 0
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            content_parts.append(delta.content)
+            emit("assistant_delta", delta.content)
+
+        for tc in delta.tool_calls or ():
+            call = calls.setdefault(tc.index, {
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""},
+            })
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function:
+                if tc.function.name:
+                    call["function"]["name"] = tc.function.name
+                if tc.function.arguments:
+                    call["function"]["arguments"] += tc.function.arguments
+
+    msg = {"role": "assistant"}
+    if content_parts:
+        msg["content"] = "".join(content_parts)
+    if calls:
+        msg["tool_calls"] = [calls[i] for i in sorted(calls)]
+    return msg, prompt_tokens
+
+
+def _parse_tool_call(tool_call: dict) -> tuple[str, dict]:
+    """Extract (name, arguments) from an assembled tool call."""
+    fn_name = tool_call["function"]["name"]
+    raw = tool_call["function"]["arguments"] or "{}"
+    try:
+        fn_args = orjson.loads(raw) if orjson else json.loads(raw)
+    except ValueError:  # both decoders raise ValueError subclasses
+        fn_args = {}
+    if not isinstance(fn_args, dict):  # valid JSON but not an object, e.g. '["a.txt"]'
+        fn_args = {}
+    return fn_name, fn_args
+
+
+def _preview_args(fn_args: dict) -> str:
+    """Compact JSON of tool arguments for progress output."""
+    if orjson:
+        return orjson.dumps(fn_args).decode()[:200]
+    return json.dumps(fn_args, ensure_ascii=False)[:200]
+
+
+async def _execute_tool_calls(run_tool, tool_calls: list[dict], emit) -> list[str]:
+    """
+    Execute a batch of tool calls and return their results in call order.
+
+    Runs of consecutive read-only tools are gathered so their latencies
+    overlap (at most TOOL_CONCURRENCY at a time); anything with side effects
+    runs alone, in order, so reads never observe a half-applied batch.
+    """
+    calls = [_parse_tool_call(tc) for tc in tool_calls]
+    results: list[str] = []
+    limit = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def bounded(fn_name: str, fn_args: dict) -> str:
+        async with limit:
+            return await run_tool(fn_name, fn_args)
+
+    i = 0
+    while i < len(calls):
+        j = i + 1
+        if calls[i][0] in PARALLEL_SAFE_TOOLS:
+            while j < len(calls) and calls[j][0] in PARALLEL_SAFE_TOOLS:
+                j += 1
+
+        batch = calls[i:j]
+        for fn_name, fn_args in batch:
+            emit("tool_call", f"{fn_name}({_preview_args(fn_args)})")
+
+        if len(batch) == 1:
+            batch_results = [await run_tool(*batch[0])]
+        else:
+            gathered = await asyncio.gather(
+                *(bounded(fn_name, fn_args) for fn_name, fn_args in batch),
+                return_exceptions=True,
+            )
+            batch_results = [
+                f"Error: {type(r).__name__}: {r}" if isinstance(r, BaseException) else r
+                for r in gathered
+            ]
+
+        for result in batch_results:
+            emit("tool_result", result)
+        results.extend(batch_results)
+        i = j
+
+    return results
+
+
+def _archive(archive: dict[str, str], content: str) -> str:
+    """Store raw tool output in the side table and return its recall id."""
+    key = hashlib.sha1(content.encode("utf-8", "surrogatepass")).hexdigest()[:8]
+    archive[key] = content
+    return key
 
-def _build_client(config: Config) -> OpenAI:
-    """Build OpenAI-compatible client based on provider config."""
-    provider = config.llm.provider.lower()
 
-    base_urls = {
-        # 国际
-        "openai": "https://api.openai.com/v1",
-        "openrouter": "https://openrouter.ai/api/v1",
-        # 国产
-        "deepseek": "https://api.deepseek.com",
-        "glm": "https://open.bigmodel.cn/api/paas/v4",             # 智谱GLM
-        "minimax": "https://api.minimax.chat/v1",                   # MiniMax
-        "moonshot": "https://api.moonshot.cn/v1",                   # Moonshot/Kimi
-        "dashscope": "https://dashscope.aliyuncs.com/compatible-mode/v1",  # 阿里通义千问
-        "doubao": "https://ark.cn-beijing.volces.com/api/v3",       # 字节豆包(火山引擎)
-        "spark": "https://spark-api-open.xf-yun.com/v1",            # 讯飞星火
-        "baichuan": "https://api.baichuan-ai.com/v1",               # 百川
-        "yi": "https://api.lingyiwanwu.com/v1",                     # 零一万物
-        "stepfun": "https://api.stepfun.com/v1",                    # 阶跃星辰
-    }
+def _pack_history(messages: list[dict], archive: dict[str, str]) -> None:
+    """
+    Keep the prompt bounded by shrinking old tool results in place.
+
+    A read_file result is replaced by a short marker when a later call read
+    the same file range. If the history is still over HISTORY_CHAR_LIMIT,
+    tool results other than the newest KEEP_RECENT_RESULTS are elided to
+    head/tail excerpts, oldest first. Raw text goes to `archive` so the model
+    can fetch it back with the recall tool.
+    """
+    calls = {}
+    for m in messages:
+        if m["role"] == "assistant":
+            for tc in m.get("tool_calls", ()):
+                calls[tc["id"]] = _parse_tool_call(tc)
+
+    tool_msgs = [m for m in messages if m["role"] == "tool"]
+
+    # Only the newest read of a given file range is worth keeping
+    seen_reads = set()
+    for m in reversed(tool_msgs):
+        fn_name, fn_args = calls.get(m["tool_call_id"], ("", {}))
+        if fn_name != "read_file" or m["content"].startswith("[superseded"):
+            continue
+        read_key = (fn_args.get("path"), fn_args.get("start_line"), fn_args.get("end_line"))
+        if read_key in seen_reads:
+            ref = _archive(archive, m["content"])
+            m["content"] = f"[superseded by a later read of {read_key[0]}; cached id={ref}]"
+        else:
+            seen_reads.add(read_key)
+
+    total = sum(len(m.get("content") or "") for m in messages)
+    for m in tool_msgs[:-KEEP_RECENT_RESULTS]:
+        if total <= HISTORY_CHAR_LIMIT:
+            break
+        content = m["content"]
+        if len(content) <= 3 * ELIDE_KEEP:
+            continue
+        ref = _archive(archive, content)
+        m["content"] = (
+            content[:ELIDE_KEEP]
+            + f"\n...[{len(content) - 2 * ELIDE_KEEP} chars elided; cached id={ref}]...\n"
+            + content[-ELIDE_KEEP:]
+        )
+        total -= len(content) - len(m["content"])
 
-    api_base = config.llm.api_base or base_urls.get(provider, base_urls["openai"])
 
-    return OpenAI(api_key=config.llm.api_key, base_url=api_base)
+def run_agent(task: str, config: RuntimeConfig, on_message=None, executor: ToolExecutor | None = None) -> str:
+    """Blocking wrapper around arun_agent for callers without an event loop."""
+    return asyncio.run(arun_agent(task, config, on_message, executor))
 
 
-def run_agent(task: str, config: Config, on_message=None) -> str:
+async def arun_agent(task: str, config: RuntimeConfig, on_message=None, executor: ToolExecutor | None = None) -> str:
     """
     Run the agent loop for a given task.
 
     Args:
         task: The user's natural language request
         config: Application config
-        on_message: Optional callback(role, content) for streaming output
+        on_message: Optional callback(role, content) for streaming output, called on the event loop
+        executor: Optional ToolExecutor to reuse (keeps its file cache warm across turns)
 
     Returns:
         Final summary string
     """
     client = _build_client(config)
-    executor = ToolExecutor(config.project.root)
+    if executor is None:
+        executor = _get_executor(config.project.root)
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": task},
-    ]
+    if config.llm.provider.lower() in _EXPLICIT_CACHE_PROVIDERS:
+        system_message = _CACHED_SYSTEM_MESSAGE
+    else:
+        system_message = _SYSTEM_MESSAGE
+    messages = [system_message, {"role": "user", "content": task}]
+    logger.debug("Prompt prefix fingerprint %s", PROMPT_PREFIX_SHA1)
 
     max_iterations = 30
     iteration = 0
+    prompt_tokens_used = 0
+    last_signature = None
+
+    # Raw text of tool results shrunk by _pack_history, keyed by recall id
+    archive: dict[str, str] = {}
+
+    async def run_tool(fn_name: str, fn_args: dict) -> str:
+        if fn_name == "recall":
+            return archive.get(fn_args.get("id", ""), f"Error: No archived result with id '{fn_args.get('id')}'")
+        return await executor.aexecute(fn_name, fn_args)
 
     def emit(role: str, content: str):
         if on_message:
             on_message(role, content)
+            return
+        console = _get_console()
+        if role == "assistant_delta":
+            console.print(content, end="", style="cyan", markup=False, highlight=False)
         elif role == "assistant":
-            console.print(Panel(Markdown(content), title="🤖 Agent", border_style="cyan"))
+            # Text was already streamed via assistant_delta; close the line
+            console.print()
         elif role == "tool_call":
             console.print(f"  🔧 [dim]{content}[/dim]")
         elif role == "tool_result":
             # Show truncated result
-            lines = content.splitlines()
-            preview = "\n".join(lines[:10])
-            if len(lines) > 10:
-                preview += f"\n  ... ({len(lines) - 10} more lines)"
-            console.print(f"  📋 [dim]{preview}[/dim]")
+            console.print(f"  📋 [dim]{_head_lines(content, 10)}[/dim]")
 
     while iteration < max_iterations:
+        budget = config.llm.max_prompt_tokens
+        if budget and prompt_tokens_used >= budget:
+            logger.warning("Prompt token budget exhausted after %d iterations (%d tokens)", iteration, prompt_tokens_used)
+            return f"Agent stopped: prompt token budget ({budget}) exhausted after {iteration} iterations."
+
         iteration += 1
 
         try:
-            response = client.chat.completions.create(
-                model=config.llm.model,
-                messages=messages,
-                tools=TOOLS_SCHEMA,
-                tool_choice="auto",
-                max_tokens=config.llm.max_tokens,
-                temperature=config.llm.temperature,
-            )
+            msg, prompt_tokens = await _stream_completion(client, config, messages, emit)
         except Exception as e:
             error_msg = f"LLM API error: {e}"
             emit("error", error_msg)
             return error_msg
-
-        choice = response.choices[0]
-        msg = choice.message
+        prompt_tokens_used += prompt_tokens
 
         # Add assistant message to history
-        messages.append(msg.model_dump(exclude_none=True))
+        messages.append(msg)
 
-        # If there's text content, show it
-        if msg.content:
-            emit("assistant", msg.content)
+        # Streamed text is complete, hand over the full content
+        content = msg.get("content")
+        if content:
+            emit("assistant", content)
 
         # If no tool calls, we're done
-        if not msg.tool_calls:
-            return msg.content or "(no response)"
-
-        # Execute each tool call
+        tool_calls = msg.get("tool_calls")
+        if not tool_calls:
+            logger.info("Agent answered after %d iterations (%d prompt tokens)", iteration, prompt_tokens_used)
+            return content or "(no response)"
+
+        # Re-issuing the exact same text and calls means the model is going in circles
+        signature = (content, tuple((tc["function"]["name"], tc["function"]["arguments"]) for tc in tool_calls))
+        if signature == last_signature:
+            logger.warning("Agent stalled at iteration %d (%d prompt tokens)", iteration, prompt_tokens_used)
+            return f"Agent stalled: repeated the same tool calls at iteration {iteration} without progress."
+        last_signature = signature
+
+        # Nothing after task_done is executed; keep history consistent with that
+        for i, tool_call in enumerate(tool_calls):
+            if tool_call["function"]["name"] == "task_done":
+                del tool_calls[i + 1:]
+                break
+
+        # Execute tool calls, overlapping consecutive read-only ones
         task_summary = None
-        for tool_call in msg.tool_calls:
-            fn_name = tool_call.function.name
-            try:
-                fn_args = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError:
-                fn_args = {}
-
-            emit("tool_call", f"{fn_name}({json.dumps(fn_args, ensure_ascii=False)[:200]})")
-
-            result = executor.execute(fn_name, fn_args)
-
-            emit("tool_result", result)
-
+        results = await _execute_tool_calls(run_tool, tool_calls, emit)
+        for tool_call, result in zip(tool_calls, results):
             # Check if task is done
             if result.startswith("__TASK_DONE__:"):
                 task_summary = result[len("__TASK_DONE__:"):]
 
             messages.append({
                 "role": "tool",
-                "tool_call_id": tool_call.id,
+                "tool_call_id": tool_call["id"],
                 "content": result,
             })
 
+        _pack_history(messages, archive)
+
         if task_summary:
             # Auto-commit if configured
             if config.project.auto_commit:
-                commit_result = executor.execute("git_commit", {"message": f"feat: {task_summary[:72]}"})
+                commit_result = await executor.aexecute("git_commit", {"message": f"feat: {task_summary[:72]}"})
                 emit("tool_result", commit_result)
+            logger.info("Task done after %d iterations (%d prompt tokens)", iteration, prompt_tokens_used)
             return task_summary
 
+    logger.warning("Agent used all %d iterations (%d prompt tokens)", max_iterations, prompt_tokens_used)
     return "Agent reached maximum iterations without completing the task."
 
 
-def chat_session(config: Config):
+def chat_session(config: RuntimeConfig):
     """Interactive multi-turn chat session with the agent."""
     from prompt_toolkit import PromptSession
     from prompt_toolkit.history import FileHistory
+    from rich.panel import Panel
 
     history_file = config.project.root + "/.openclaw_history"
     session = PromptSession(history=FileHistory(history_file))
 
+    # One executor for the whole session so file reads stay cached between turns
+    cache_path = get_config_dir() / "filecache.json"
+    executor = ToolExecutor(config.project.root, FileCache.load(cache_path))
+
+    console = _get_console()
     console.print(Panel(
         "[bold cyan]🤖 OpenClaw Bot[/bold cyan]\n"
         "自主编码 Agent — 告诉我你想要什么，我来实现。\n\n"
@@ -185,9 +511,23 @@ def chat_session(config: Config):
         border_style="cyan",
     ))
 
+    try:
+        asyncio.run(_chat_loop(session, config, executor))
+    finally:
+        try:
+            executor.file_cache.save(cache_path)
+        except OSError:
+            pass
+
+
+async def _chat_loop(session, config: RuntimeConfig, executor: ToolExecutor):
+    """Read prompts and run the agent on one event loop, so the LLM client's connections are reused."""
+    from rich.panel import Panel
+
+    console = _get_console()
     while True:
         try:
-            user_input = session.prompt("\n🧑 你: ").strip()
+            user_input = (await session.prompt_async("\n🧑 你: ")).strip()
         except (EOFError, KeyboardInterrupt):
             console.print("\n👋 再见!")
             break
@@ -202,5 +542,5 @@ def chat_session(config: Config):
             continue
 
         console.print()
-        result = run_agent(user_input, config)
+        result = await arun_agent(user_input, config, executor=executor)
         console.print(Panel(f"✅ {result}", title="完成", border_style="green"))
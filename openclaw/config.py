@@ -1,10 +1,17 @@
 """Configuration management."""
 
+import functools
 import json
 import os
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 from pydantic import BaseModel, Field
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
 
 class LLMConfig(BaseModel):
     """LLM provider configuration."""
@@ -14,6 +21,7 @@ class LLMConfig(BaseModel):
     model: str = "deepseek-chat"
     max_tokens: int = 4096
     temperature: float = 0.3
+    max_prompt_tokens: int = 0  # per-task budget across all iterations; 0 = unlimited
 
 
 class TelegramConfig(BaseModel):
@@ -26,14 +34,16 @@ class TelegramConfig(BaseModel):
 def _detect_bot_dir() -> str:
     """Find the openclaw_bot install directory."""
     # Check common locations
-    from pathlib import Path
-    candidates = [
-        Path.home() / "openclaw_bot",
-        Path(__file__).resolve().parent.parent,  # ../openclaw/ -> ../
-    ]
+    candidates = (
+        os.path.join(os.path.expanduser("~"), "openclaw_bot"),
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),  # ../openclaw/ -> ../
+    )
     for c in candidates:
-        if (c / "pyproject.toml").exists():
-            return str(c)
+        try:
+            os.stat(os.path.join(c, "pyproject.toml"))
+        except OSError:
+            continue
+        return c
     return "."
 
 
@@ -51,6 +61,51 @@ class Config(BaseModel):
     project: ProjectConfig = Field(default_factory=ProjectConfig)
 
 
+# Plain mirrors of the models above for the runtime path: load_config() builds
+# these straight from the JSON, so reading config never runs pydantic validation.
+# Field names and defaults must match the pydantic models.
+
+@dataclass(slots=True)
+class RuntimeLLMConfig:
+    """Unvalidated runtime view of LLMConfig."""
+    provider: str = "deepseek"
+    api_key: str = ""
+    api_base: str | None = None
+    model: str = "deepseek-chat"
+    max_tokens: int = 4096
+    temperature: float = 0.3
+    max_prompt_tokens: int = 0
+
+
+@dataclass(slots=True)
+class RuntimeTelegramConfig:
+    """Unvalidated runtime view of TelegramConfig."""
+    enabled: bool = False
+    token: str = ""
+    allowed_users: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class RuntimeProjectConfig:
+    """Unvalidated runtime view of ProjectConfig."""
+    root: str = "."
+    auto_commit: bool = True
+    branch: str = "main"
+
+
+@dataclass(slots=True)
+class RuntimeConfig:
+    """Unvalidated runtime view of Config, as returned by load_config()."""
+    llm: RuntimeLLMConfig = field(default_factory=RuntimeLLMConfig)
+    telegram: RuntimeTelegramConfig = field(default_factory=RuntimeTelegramConfig)
+    project: RuntimeProjectConfig = field(default_factory=RuntimeProjectConfig)
+
+
+def _from_dict(cls, data: dict):
+    """Build a runtime dataclass from known keys of `data`; missing keys keep defaults."""
+    return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+
+
 def get_config_dir() -> Path:
     """Get config directory path."""
     return Path.home() / ".openclaw"
@@ -61,14 +116,22 @@ def get_config_path() -> Path:
     return get_config_dir() / "config.json"
 
 
-def load_config() -> Config:
-    """Load config from file, env vars, or defaults."""
+@functools.lru_cache(maxsize=1)
+def load_config() -> RuntimeConfig:
+    """
+    Load config from file, env vars, or defaults.
+
+    The result is cached for the life of the process (callers share one
+    instance); save_config() invalidates it.
+    """
     path = get_config_path()
     data = {}
 
     if path.exists():
-        with open(path) as f:
-            data = json.load(f)
+        if orjson:
+            data = orjson.loads(path.read_bytes())
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
 
     # Environment variable overrides
     if api_key := os.environ.get("OPENCLAW_API_KEY"):
@@ -81,15 +144,22 @@ def load_config() -> Config:
         data.setdefault("telegram", {})["token"] = tg_token
         data["telegram"]["enabled"] = True
 
-    return Config.model_validate(data)
+    return RuntimeConfig(
+        llm=_from_dict(RuntimeLLMConfig, data.get("llm") or {}),
+        telegram=_from_dict(RuntimeTelegramConfig, data.get("telegram") or {}),
+        project=_from_dict(RuntimeProjectConfig, data.get("project") or {}),
+    )
 
 
 def save_config(config: Config) -> None:
     """Save config to file."""
     path = get_config_path()
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(config.model_dump(), f, indent=2, ensure_ascii=False)
+    if orjson:
+        path.write_bytes(orjson.dumps(config.model_dump(), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        path.write_text(json.dumps(config.model_dump(), indent=2, ensure_ascii=False), encoding="utf-8")
+    load_config.cache_clear()
 
 
 def init_config_interactive() -> Config:
@@ -1,29 +1,105 @@
 """Telegram bot interface for OpenClaw agent."""
 
+from __future__ import annotations
+
 import asyncio
+import contextlib
 import logging
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+import os
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from openclaw.config import RuntimeConfig
+from openclaw.agent import arun_agent
+from openclaw.tools import ToolExecutor
 
-from openclaw.config import Config
-from openclaw.agent import run_agent
+if TYPE_CHECKING:
+    from telegram import Message, Update
+    from telegram.ext import ContextTypes
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between progress edits of the placeholder message
+# (Telegram allows roughly one message update per second per chat)
+EDIT_INTERVAL = 0.7
+
+
+class _LiveMessage:
+    """
+    Mirrors streamed agent output into one Telegram message.
+
+    Appends are coalesced and flushed by a background task at most once per
+    EDIT_INTERVAL, so a burst of tokens costs a single edit.
+    """
+
+    def __init__(self, message: Message):
+        self.message = message
+        self._text = ""
+        self._shown = ""
+        self._last_edit = 0.0
+        self._flush_task: asyncio.Task | None = None
+
+    def append(self, text: str) -> None:
+        self._text += text
+        if len(self._text) > 8000:
+            self._text = self._text[-3900:]
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(max(0.0, self._last_edit + EDIT_INTERVAL - time.monotonic()))
+                text = self._text[-3900:]
+                if text == self._shown or not text.strip():
+                    return
+                await self._edit(text)
+        except Exception as e:
+            logger.debug("Progress edit failed: %s", e)
+
+    async def _edit(self, text: str, **kwargs) -> None:
+        from telegram.error import RetryAfter
+
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit_text(text, **kwargs)
+        except RetryAfter as e:
+            delay = e.retry_after
+            await asyncio.sleep(delay.total_seconds() if isinstance(delay, timedelta) else delay)
+            self._last_edit = time.monotonic()
+            await self.message.edit_text(text, **kwargs)
+        self._shown = text
+
+    async def finish(self, text: str, **kwargs) -> None:
+        """Drop any pending progress edit and replace the message with `text`."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self._edit(text, **kwargs)
+
 
 class TelegramBot:
     """Telegram bot that forwards messages to the coding agent."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: RuntimeConfig):
         self.config = config
         self._running = False
+        self._executor = ToolExecutor(self.config.project.root)
+        self._allowed: frozenset[str] = frozenset(self.config.telegram.allowed_users)
+        self._unrestricted = not self._allowed
+        # Caps simultaneous agent runs; commands like /status never wait on it
+        self._agent_slots = asyncio.Semaphore(int(os.environ.get("OPENCLAW_AGENT_CONCURRENCY", "4")))
 
     def _is_allowed(self, user_id: str, username: str | None) -> bool:
         """Check if user is allowed to use the bot."""
-        allowed = self.config.telegram.allowed_users
-        if not allowed:
-            return True  # No restrictions
-        return str(user_id) in allowed or (username and username in allowed)
+        return (
+            self._unrestricted  # No restrictions
+            or user_id in self._allowed
+            or (username is not None and username in self._allowed)
+        )
 
     async def _cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user = update.effective_user
@@ -48,10 +124,6 @@ class TelegramBot:
         if not self._is_allowed(str(user.id), user.username):
             return
 
-        from openclaw.tools import ToolExecutor
-        executor = ToolExecutor(self.config.project.root)
-        tree = executor.execute("list_dir", {"path": "."})
-
         await update.message.reply_text(
             f"🤖 *OpenClaw Bot Status*\n\n"
             f"📁 项目: `{self.config.project.root}`\n"
@@ -66,9 +138,7 @@ class TelegramBot:
         if not self._is_allowed(str(user.id), user.username):
             return
 
-        from openclaw.tools import ToolExecutor
-        executor = ToolExecutor(self.config.project.root)
-        tree = executor.execute("list_dir", {"path": "."})
+        tree = self._executor.execute("list_dir", {"path": "."})
 
         await update.message.reply_text(f"```\n{tree}\n```", parse_mode="Markdown")
 
@@ -86,20 +156,24 @@ class TelegramBot:
         # Send "working" indicator
         thinking_msg = await update.message.reply_text("🔄 正在分析需求并执行...")
 
-        # Collect agent output
+        # Collect agent output; streamed text is mirrored live into the placeholder
         output_lines = []
+        live = _LiveMessage(thinking_msg)
 
         def on_message(role: str, content: str):
             if role == "tool_call":
                 output_lines.append(f"🔧 {content[:100]}")
+                live.append(f"\n🔧 {content[:100]}\n")
+            elif role == "assistant_delta":
+                live.append(content)
             elif role == "assistant":
                 output_lines.append(content)
 
-        # Run agent in thread to avoid blocking
         try:
-            result = await asyncio.to_thread(run_agent, task, self.config, on_message)
+            async with self._agent_slots:
+                result = await arun_agent(task, self.config, on_message, self._executor)
         except Exception as e:
-            await thinking_msg.edit_text(f"❌ 执行出错: {e}")
+            await live.finish(f"❌ 执行出错: {e}")
             return
 
         # Build response
@@ -119,21 +193,30 @@ class TelegramBot:
             response_text = response_text[:2000] + "\n\n...(truncated)...\n\n" + response_text[-1500:]
 
         try:
-            await thinking_msg.edit_text(response_text, parse_mode="Markdown")
+            await live.finish(response_text, parse_mode="Markdown")
         except Exception:
             # Fallback without markdown if parsing fails
-            await thinking_msg.edit_text(response_text)
+            await live.finish(response_text)
 
     def run(self):
         """Start the Telegram bot (blocking)."""
         if not self.config.telegram.token:
             raise ValueError("Telegram bot token not configured. Set it in ~/.openclaw/config.json")
 
+        from telegram import Update
+        from telegram.ext import Application, CommandHandler, MessageHandler, filters
+
         print(f"🤖 OpenClaw Telegram Bot 启动中...")
         print(f"📁 项目目录: {self.config.project.root}")
         print(f"🧠 模型: {self.config.llm.model}")
 
-        app = Application.builder().token(self.config.telegram.token).build()
+        # PTB handles updates one at a time by default; agent runs are bounded by _agent_slots instead
+        app = (
+            Application.builder()
+            .token(self.config.telegram.token)
+            .concurrent_updates(True)
+            .build()
+        )
 
         app.add_handler(CommandHandler("start", self._cmd_start))
         app.add_handler(CommandHandler("status", self._cmd_status))
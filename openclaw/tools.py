@@ -1,8 +1,22 @@
 """Tools that the AI agent can call to interact with the codebase."""
 
+import asyncio
+import contextlib
+import fnmatch
+import functools
 import os
+import re
+import signal
 import subprocess
 import json
+import hashlib
+import io
+import mmap
+import stat
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -72,7 +86,7 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "search_code",
-            "description": "Search for a pattern in project files using grep. Returns matching lines with file paths and line numbers.",
+            "description": "Search for a pattern (case-insensitive) in project files. Returns matching lines with file paths and line numbers.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -129,30 +143,410 @@ TOOLS_SCHEMA = [
     },
 ]
 
+# Compact wire form of the schema, serialized once; the schema is never mutated after import
+TOOLS_SCHEMA_JSON = json.dumps(TOOLS_SCHEMA, separators=(",", ":"), ensure_ascii=False)
+
+
+# Directories never worth descending into when searching
+_SKIP_DIRS = frozenset({".git", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache"})
+
+MAX_SEARCH_RESULTS = 50
+
+# Per-file scans release the GIL inside re and during page faults, so a few
+# threads per core overlap disk latency with matching
+_SEARCH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_search_pool = ThreadPoolExecutor(max_workers=_SEARCH_WORKERS, thread_name_prefix="search")
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_search(pattern: str) -> re.Pattern:
+    """Compile a search pattern to a case-insensitive bytes regex; invalid regexes match literally."""
+    try:
+        return re.compile(pattern.encode("utf-8"), re.IGNORECASE | re.MULTILINE)
+    except re.error:
+        return re.compile(re.escape(pattern.encode("utf-8")), re.IGNORECASE | re.MULTILINE)
+
+
+def _walk_files(top: str, include: str | None = None):
+    """Yield file paths under `top` depth-first, skipping _SKIP_DIRS and non-matching names."""
+    stack = [top]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _SKIP_DIRS:
+                            subdirs.append(entry.path)
+                    # Symlinks are not followed (like grep -r): they may point outside the project
+                    elif entry.is_file(follow_symlinks=False) and (not include or fnmatch.fnmatch(entry.name, include)):
+                        yield entry.path
+                except OSError:
+                    continue
+        stack.extend(reversed(subdirs))
+
+
+def _search_file(compiled: re.Pattern, fpath: str, limit: int) -> list[tuple[int, str]]:
+    """
+    Return up to `limit` (line number, line) hits of `compiled` in one file.
+
+    The file is mapped and scanned as bytes; only matching lines are decoded.
+    Binary files (NUL in the first 8 KiB) are skipped, like grep does.
+    """
+    hits = []
+    try:
+        with open(fpath, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return hits
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\0", 0, 8192) != -1:
+                    return hits
+                size = len(mm)
+                pos = counted = 0
+                line_no = 1
+                while len(hits) < limit:
+                    m = compiled.search(mm, pos)
+                    if not m:
+                        break
+                    start = m.start()
+                    if start == size and mm[size - 1] == 0x0A:
+                        break  # empty match after the final LF: there is no line there
+                    line_no += _count_newlines(mm, counted, start)
+                    counted = start
+                    line_start = mm.rfind(b"\n", 0, start) + 1
+                    line_end = mm.find(b"\n", start)
+                    if line_end == -1:
+                        line_end = size
+                    hits.append((line_no, mm[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r")))
+                    # One hit per line, like grep; resume on the next line
+                    pos = line_end + 1
+                    if pos >= size:
+                        break
+    except (OSError, ValueError):
+        pass
+    return hits
+
+
+def _line_offset(buf, n: int) -> int:
+    """Byte offset where 0-indexed line `n` starts in `buf` (len(buf) if past the end)."""
+    pos = 0
+    for _ in range(n):
+        nl = buf.find(b"\n", pos)
+        if nl == -1:
+            return len(buf)
+        pos = nl + 1
+    return pos
+
+
+def _count_newlines(buf, start: int = 0, end: int | None = None) -> int:
+    """Number of LF bytes in buf[start:end], counted without copying the whole range."""
+    if end is None:
+        end = len(buf)
+    step = 1 << 20  # mmap has no count(); 1 MiB slices keep each copy cache-sized
+    return sum(buf[i:min(i + step, end)].count(b"\n") for i in range(start, end, step))
+
+
+def _count_lines(buf) -> int:
+    """Number of LF-terminated lines in `buf`; a final line without LF counts too."""
+    size = len(buf)
+    if not size:
+        return 0
+    return _count_newlines(buf) + (0 if buf[size - 1:size] == b"\n" else 1)
+
+
+def _count_occurrences(buf, needle: bytes) -> int:
+    """Non-overlapping occurrences of `needle` in `buf` (mmap has no count())."""
+    count, pos, step = 0, buf.find(needle), max(len(needle), 1)
+    while pos != -1:
+        count += 1
+        pos = buf.find(needle, pos + step)
+    return count
+
+
+def _has_untracked(porcelain: bytes) -> bool:
+    """True if `git status --porcelain=v1 -z` output lists any untracked ("??") path."""
+    fields = iter(porcelain.split(b"\0"))
+    for entry in fields:
+        if entry[:2] == b"??":
+            return True
+        if entry[:1] in (b"R", b"C"):
+            next(fields, None)  # renames and copies carry their source path as an extra field
+    return False
+
+
+def _write_temp(fp: Path, chunks) -> str:
+    """Write `chunks` to a fsynced temp file beside `fp` and return its path."""
+    # Not mkstemp: its 0o600 would stick to new files. Creating with 0o666 lets the
+    # kernel apply the umask, exactly as for a plain open().
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp = os.path.join(fp.parent, f".{fp.name}.{os.urandom(4).hex()}.tmp")
+        try:
+            fd = os.open(tmp, flags, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    return tmp
+
+
+def _commit_temp(tmp: str, fp: Path) -> None:
+    """Rename the temp file from _write_temp over `fp`, keeping fp's mode if it already exists."""
+    try:
+        with contextlib.suppress(FileNotFoundError):  # new file: keep the umask-derived mode
+            os.chmod(tmp, stat.S_IMODE(os.stat(fp).st_mode))
+        os.replace(tmp, fp)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def _replace_file(fp: Path, chunks) -> None:
+    """
+    Atomically replace `fp` with the concatenation of `chunks`.
+
+    The data goes to a temp file in the same directory, is fsynced, and is
+    renamed over `fp`, so readers see either the old or the new content and
+    never a truncated file. An existing file keeps its mode; a new one gets
+    the usual 0o666 & ~umask.
+    """
+    _commit_temp(_write_temp(fp, chunks), fp)
+
+
+def _sha256_prefix(data: bytes) -> str:
+    """Short content fingerprint used to revalidate large cached files."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+# Anything the shell would interpret; commands free of these can be exec'd directly
+_SHELL_SYNTAX = re.compile(r"""[|&;<>()$`\\"'*?\[\]{}~#!\n]""")
+
+
+def _command_argv(command: str) -> list[str] | None:
+    """Split `command` into an argv when no shell is needed to run it, else None."""
+    if _SHELL_SYNTAX.search(command):
+        return None
+    # Without quotes or escapes, shlex.split() reduces to a whitespace split
+    argv = command.split()
+    if not argv or "=" in argv[0]:  # empty, or a leading VAR=value assignment
+        return None
+    return argv
+
+
+def _kill_process_group(proc) -> None:
+    """
+    Kill `proc` together with everything it spawned.
+
+    Commands are started as session leaders, so the group id is the pid and
+    killpg also reaches grandchildren that the shell left holding the pipe.
+    """
+    if not hasattr(os, "killpg"):  # Windows: no process groups to signal
+        with contextlib.suppress(OSError):
+            proc.kill()
+        return
+    with contextlib.suppress(OSError):  # group already gone
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+class _OutputBuffer:
+    """
+    Collects a command's combined output without holding all of it.
+
+    The first LIMIT bytes are kept verbatim; past that only a rolling tail
+    survives, so a build that prints hundreds of MB stays a few KB in memory.
+    """
+
+    LIMIT = 8000
+    HEAD = 4000
+    TAIL = 2000
+    CHUNK = 64 * 1024
+
+    def __init__(self):
+        self._head = bytearray()
+        self._tail: deque[bytes] = deque()
+        self._tail_len = 0
+
+    def feed(self, chunk: bytes) -> None:
+        room = self.LIMIT - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self._tail.append(chunk)
+            self._tail_len += len(chunk)
+            while self._tail_len - len(self._tail[0]) >= self.TAIL:
+                self._tail_len -= len(self._tail.popleft())
+
+    def drain(self, stream) -> None:
+        """Feed everything readable from a binary `stream` until EOF."""
+        try:
+            while chunk := stream.read1(self.CHUNK):
+                self.feed(chunk)
+        except (OSError, ValueError):  # pipe closed under us after a kill
+            pass
+
+    def text(self) -> str:
+        if not self._tail:
+            return self._head.decode("utf-8", errors="replace")
+        tail = (bytes(self._head[-self.TAIL:]) + b"".join(self._tail))[-self.TAIL:]
+        return (
+            self._head[:self.HEAD].decode("utf-8", errors="replace")
+            + "\n\n... (truncated) ...\n\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+
+def _format_command_result(returncode: int, output: str) -> str:
+    """Render a finished command as "[status]" plus its (already truncated) output."""
+    status = "OK" if returncode == 0 else f"FAILED (exit code {returncode})"
+    return f"[{status}]\n{output}" if output else f"[{status}]"
+
+
+class FileCache:
+    """
+    LRU cache of read_file results, validated against the file's stat.
+
+    Entries are keyed by absolute path and hold every rendered line range
+    requested so far. An entry is reused while (st_mtime_ns, st_size) is
+    unchanged; large files also keep a content hash so a bare mtime bump
+    (touch, checkout of identical content) does not force a re-render.
+    """
+
+    HASH_MIN_SIZE = 256 * 1024  # only fingerprint files at least this big
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result, view: str) -> str | None:
+        """Return the cached rendering of `view` for `path`, or None."""
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+
+        if (entry["mtime_ns"], entry["size"]) != (st.st_mtime_ns, st.st_size):
+            digest = entry.get("sha256")
+            try:
+                same = digest is not None and entry["size"] == st.st_size \
+                    and _sha256_prefix(Path(path).read_bytes()) == digest
+            except OSError:
+                same = False
+            with self._lock:
+                if not same:
+                    self._entries.pop(path, None)
+                    return None
+                entry["mtime_ns"] = st.st_mtime_ns
+
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+            return entry["views"].get(view)
+
+    def put(self, path: str, st: os.stat_result, view: str, result: str, data=None) -> None:
+        """Store a rendering of `view`; `data` is the raw content (any buffer) used for fingerprinting."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or (entry["mtime_ns"], entry["size"]) != (st.st_mtime_ns, st.st_size):
+                entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "views": {}}
+                if data is not None and st.st_size >= self.HASH_MIN_SIZE:
+                    entry["sha256"] = _sha256_prefix(data)
+                self._entries[path] = entry
+            entry["views"][view] = result
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: str) -> None:
+        """Drop everything cached for `path`."""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    @classmethod
+    def load(cls, path: Path, maxsize: int = 256) -> "FileCache":
+        """Load a cache persisted with save(); a missing or corrupt file yields an empty cache."""
+        cache = cls(maxsize)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cache
+        if isinstance(data, dict):
+            for key, entry in list(data.items())[-maxsize:]:
+                if isinstance(entry, dict) and {"mtime_ns", "size", "views"} <= entry.keys():
+                    cache._entries[key] = entry
+        return cache
+
+    def save(self, path: Path) -> None:
+        """Persist the cache as JSON so later sessions start warm."""
+        with self._lock:
+            data = dict(self._entries)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
 
 class ToolExecutor:
     """Executes tool calls from the LLM against the project filesystem."""
 
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, file_cache: FileCache | None = None):
         self.root = Path(project_root).resolve()
+        self.file_cache = file_cache if file_cache is not None else FileCache()
+        self._root_str = str(self.root)
+        self._root_sep = os.path.join(self._root_str, "")  # "/proj/" (just "/" for a root of "/")
+        # Pre-bound handlers: dispatch is a single dict lookup per tool call
+        self._handlers = {name: fn.__get__(self) for name, fn in self._HANDLERS.items()}
 
     def _resolve(self, path: str) -> Path:
         """Resolve a relative path against project root, with safety check."""
-        resolved = (self.root / path).resolve()
-        if not str(resolved).startswith(str(self.root)):
+        # Lexical check first: "../x" or an absolute path is rejected without touching the disk
+        candidate = os.path.normpath(os.path.join(self._root_str, path))
+        # Compare against root + separator so a sibling like "/proj-other" is rejected
+        if candidate != self._root_str and not candidate.startswith(self._root_sep):
             raise ValueError(f"Path escapes project root: {path}")
-        return resolved
+        # Then follow symlinks, every call: run_command can swap a file for a link pointing outside
+        real = os.path.realpath(candidate)
+        if real != self._root_str and not real.startswith(self._root_sep):
+            raise ValueError(f"Path escapes project root: {path}")
+        return Path(real)
 
     def execute(self, name: str, args: dict) -> str:
         """Execute a tool by name and return the result string."""
         try:
-            handler = getattr(self, f"_tool_{name}", None)
+            handler = self._handlers.get(name)
             if not handler:
                 return f"Error: Unknown tool '{name}'"
             return handler(**args)
         except Exception as e:
             return f"Error: {type(e).__name__}: {e}"
 
+    async def aexecute(self, name: str, args: dict) -> str:
+        """
+        Async variant of execute.
+
+        run_command drives its subprocess on the event loop; filesystem tools
+        are short blocking calls and run on a worker thread.
+        """
+        if name == "run_command":
+            try:
+                return await self._atool_run_command(**args)
+            except Exception as e:
+                return f"Error: {type(e).__name__}: {e}"
+        return await asyncio.to_thread(self.execute, name, args)
+
     def _tool_read_file(self, path: str, start_line: int | None = None, end_line: int | None = None) -> str:
         fp = self._resolve(path)
         if not fp.exists():
@@ -160,19 +554,59 @@ class ToolExecutor:
         if not fp.is_file():
             return f"Error: Not a file: {path}"
 
-        lines = fp.read_text(encoding="utf-8", errors="replace").splitlines()
-        start = (start_line or 1) - 1
-        end = end_line or len(lines)
-        selected = lines[start:end]
-
-        numbered = [f"{i + start + 1:4d} | {line}" for i, line in enumerate(selected)]
-        return f"File: {path} ({len(lines)} lines total)\n" + "\n".join(numbered)
+        key = str(fp)
+        view = f"{path}:{start_line}:{end_line}"
+        st = os.stat(key)
+        cached = self.file_cache.get(key, st, view)
+        if cached is not None:
+            return cached
+
+        start = max((start_line or 1) - 1, 0)
+        with open(key, "rb") as f:
+            try:
+                # Map the file and decode only the requested line window
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+            except (OSError, ValueError):
+                buf = f.read()
+            try:
+                total = _count_lines(buf)
+                start_off = _line_offset(buf, start)
+                end_off = _line_offset(buf, end_line) if end_line else len(buf)
+                # Split on LF only, so window numbering agrees with the byte-level total
+                # No isascii() pre-check: CPython's UTF-8 decoder already copies ASCII runs
+                # word-at-a-time, and the error handler only runs on invalid bytes
+                text = buf[start_off:end_off].decode("utf-8", errors="replace")
+                if "\r" in text:
+                    text = text.replace("\r\n", "\n")
+                selected = text.removesuffix("\n").split("\n") if text else []
+
+                out = io.StringIO()
+                write = out.write
+                write(f"File: {path} ({total} lines total)\n")
+                # One fixed-width number column for the whole window, no per-line format spec
+                width = max(4, len(str(start + len(selected))))
+                sep = ""
+                for i, line in enumerate(selected, start + 1):
+                    write(sep)
+                    write(str(i).rjust(width))
+                    write(" | ")
+                    write(line)
+                    sep = "\n"
+                result = out.getvalue()
+                self.file_cache.put(key, st, view, result, buf)
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+        return result
 
     def _tool_write_file(self, path: str, content: str) -> str:
         fp = self._resolve(path)
         fp.parent.mkdir(parents=True, exist_ok=True)
-        fp.write_text(content, encoding="utf-8")
-        lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+        # Encode once; the bytes are both written and scanned for newlines
+        data = content.encode("utf-8")
+        _replace_file(fp, (data,))
+        self.file_cache.invalidate(str(fp))
+        lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
         return f"OK: Wrote {lines} lines to {path}"
 
     def _tool_edit_file(self, path: str, old_string: str, new_string: str) -> str:
@@ -180,15 +614,38 @@ class ToolExecutor:
         if not fp.exists():
             return f"Error: File not found: {path}"
 
-        text = fp.read_text(encoding="utf-8")
-        count = text.count(old_string)
-        if count == 0:
-            return f"Error: old_string not found in {path}"
-        if count > 1:
-            return f"Error: old_string found {count} times in {path}, must be unique. Provide more context."
-
-        new_text = text.replace(old_string, new_string, 1)
-        fp.write_text(new_text, encoding="utf-8")
+        needle = old_string.encode("utf-8")
+        replacement = new_string.encode("utf-8")
+        with open(fp, "rb") as f:
+            # mmap cannot map an empty file
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        try:
+            first = buf.find(needle)
+            if first == -1 and b"\n" in needle and buf.find(b"\r\n") != -1:
+                # CRLF file: the model quotes lines with LF, so retry with CRLF endings
+                needle = needle.replace(b"\n", b"\r\n")
+                replacement = replacement.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+                first = buf.find(needle)
+            if first == -1:
+                return f"Error: old_string not found in {path}"
+            if buf.find(needle, first + max(len(needle), 1)) != -1:
+                count = _count_occurrences(buf, needle)
+                return f"Error: old_string found {count} times in {path}, must be unique. Provide more context."
+
+            with memoryview(buf) as view:
+                head, tail = view[:first], view[first + len(needle):]
+                try:
+                    tmp = _write_temp(fp, (head, replacement, tail))
+                finally:
+                    # A traceback can keep the slices alive; release them so the mmap can close
+                    head.release()
+                    tail.release()
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+        # Rename only once the file is unmapped (Windows refuses to replace a mapped file)
+        _commit_temp(tmp, fp)
+        self.file_cache.invalidate(str(fp))
         return f"OK: Replaced 1 occurrence in {path}"
 
     def _tool_list_dir(self, path: str = ".") -> str:
@@ -198,107 +655,158 @@ class ToolExecutor:
         if not dp.is_dir():
             return f"Error: Not a directory: {path}"
 
-        entries = sorted(dp.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
+        # Drop noise dirs before sorting; DirEntry carries the type from the scan itself
+        entries = []
+        with os.scandir(dp) as it:
+            for entry in it:
+                if entry.name in _SKIP_DIRS:
+                    continue
+                is_dir = entry.is_dir()
+                entries.append((not is_dir, entry.name.lower(), entry.name, is_dir, entry))
+        entries.sort(key=lambda e: e[:3])
+
+        prefix = "" if dp == self.root else os.path.join(str(dp.relative_to(self.root)), "")
         result = []
-        for entry in entries:
-            rel = entry.relative_to(self.root)
-            if entry.name.startswith(".") and entry.name in (".git", "__pycache__", ".venv", "venv"):
-                continue
-            suffix = "/" if entry.is_dir() else f"  ({entry.stat().st_size} bytes)"
-            result.append(f"  {rel}{suffix}")
+        for _, _, name, is_dir, entry in entries:
+            if is_dir:
+                suffix = "/"
+            else:
+                try:
+                    size = entry.stat().st_size
+                except OSError:  # dangling symlink
+                    size = entry.stat(follow_symlinks=False).st_size
+                suffix = f"  ({size} bytes)"
+            result.append(f"  {prefix}{name}{suffix}")
 
         return f"Directory: {path}\n" + "\n".join(result) if result else f"Directory: {path} (empty)"
 
     def _tool_search_code(self, pattern: str, path: str = ".", include: str | None = None) -> str:
         dp = self._resolve(path)
-        cmd = ["grep", "-rn", "--color=never"]
-        if include:
-            cmd.extend(["--include", include])
-        cmd.extend([pattern, str(dp)])
-
-        # Try grep first, fall back to findstr on Windows
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=15, cwd=str(self.root))
-            output = result.stdout
-        except FileNotFoundError:
-            # Windows fallback: use Python-based search
-            output = self._python_search(pattern, dp, include)
-
-        if not output.strip():
+        output = self._python_search(pattern, dp, include)
+        if not output:
             return f"No matches found for '{pattern}'"
-
-        # Make paths relative
-        lines = output.strip().splitlines()[:50]  # cap at 50 results
-        cleaned = []
-        for line in lines:
-            line = line.replace(str(self.root) + os.sep, "").replace(str(self.root) + "/", "")
-            cleaned.append(line)
-
-        return "\n".join(cleaned)
+        return output
 
     def _python_search(self, pattern: str, search_path: Path, include: str | None = None) -> str:
-        """Fallback search using Python when grep is not available."""
-        import re
-        import fnmatch
-
+        """Search files in-process with one compiled bytes regex, grep -rn style."""
+        compiled = _compile_search(pattern)
+        root_prefix = self._root_sep
+        if search_path.is_file():
+            files = iter([str(search_path)])
+        else:
+            files = _walk_files(str(search_path), include)
+
+        # Scan a sliding window of files concurrently but collect in walk order:
+        # output stays stable and an early 50th hit stops both walk and scans
         results = []
+        pending = deque()
         try:
-            compiled = re.compile(pattern, re.IGNORECASE)
-        except re.error:
-            compiled = re.compile(re.escape(pattern), re.IGNORECASE)
-
-        skip_dirs = {".git", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache"}
-
-        for root, dirs, files in os.walk(search_path):
-            dirs[:] = [d for d in dirs if d not in skip_dirs]
-            for fname in files:
-                if include and not fnmatch.fnmatch(fname, include):
-                    continue
-                fpath = Path(root) / fname
-                try:
-                    text = fpath.read_text(encoding="utf-8", errors="ignore")
-                    for i, line in enumerate(text.splitlines(), 1):
-                        if compiled.search(line):
-                            rel = fpath.relative_to(self.root)
-                            results.append(f"{rel}:{i}:{line}")
-                            if len(results) >= 50:
-                                return "\n".join(results)
-                except (OSError, UnicodeDecodeError):
-                    continue
+            while True:
+                while len(pending) < 2 * _SEARCH_WORKERS:
+                    fpath = next(files, None)
+                    if fpath is None:
+                        break
+                    # A file can never contribute more hits than are still missing
+                    remaining = MAX_SEARCH_RESULTS - len(results)
+                    pending.append((fpath, _search_pool.submit(_search_file, compiled, fpath, remaining)))
+                if not pending:
+                    break
+
+                fpath, future = pending.popleft()
+                rel = fpath.removeprefix(root_prefix)
+                for line_no, line in future.result():
+                    results.append(f"{rel}:{line_no}:{line}")
+                    if len(results) >= MAX_SEARCH_RESULTS:
+                        return "\n".join(results)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if hasattr(files, "close"):
+                files.close()  # an abandoned walk releases its open scandir handle now, not at GC
 
         return "\n".join(results)
 
     def _tool_run_command(self, command: str, timeout: int = 60) -> str:
+        # Stream stdout+stderr through a bounded buffer instead of capturing it all
+        popen = functools.partial(
+            subprocess.Popen,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self._root_str,
+            start_new_session=True,  # own process group, so a timeout can kill the whole tree
+        )
+        argv = _command_argv(command)
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=str(self.root),
-            )
-            output = ""
-            if result.stdout:
-                output += result.stdout
-            if result.stderr:
-                output += ("\n" if output else "") + result.stderr
-
-            # Truncate very long output
-            if len(output) > 8000:
-                output = output[:4000] + "\n\n... (truncated) ...\n\n" + output[-2000:]
-
-            status = "OK" if result.returncode == 0 else f"FAILED (exit code {result.returncode})"
-            return f"[{status}]\n{output}" if output else f"[{status}]"
+            proc = popen(argv) if argv else popen(command, shell=True)
+        except OSError:
+            # Not an executable (a builtin like cd, or a typo): let the shell run or report it
+            proc = popen(command, shell=True)
+        output = _OutputBuffer()
+        reader = threading.Thread(target=output.drain, args=(proc.stdout,), daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout
+        try:
+            proc.wait(timeout)
         except subprocess.TimeoutExpired:
+            pass
+        # A grandchild (e.g. "cd app && npm start") can hold the pipe open past the shell
+        reader.join(max(0.0, deadline - time.monotonic()))
+        if proc.returncode is None or reader.is_alive():
+            _kill_process_group(proc)
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                proc.wait(5)
+            return f"Error: Command timed out after {timeout}s"
+        return _format_command_result(proc.returncode, output.text())
+
+    async def _atool_run_command(self, command: str, timeout: int = 60) -> str:
+        pipes = dict(
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=self._root_str,
+            start_new_session=True,  # own process group, so a timeout can kill the whole tree
+        )
+        argv = _command_argv(command)
+        proc = None
+        if argv:
+            with contextlib.suppress(OSError):  # not an executable: fall back to the shell
+                proc = await asyncio.create_subprocess_exec(*argv, **pipes)
+        if proc is None:
+            proc = await asyncio.create_subprocess_shell(command, **pipes)
+        output = _OutputBuffer()
+
+        async def drain():
+            while chunk := await proc.stdout.read(output.CHUNK):
+                output.feed(chunk)
+            await proc.wait()
+
+        try:
+            await asyncio.wait_for(drain(), timeout)
+        except asyncio.TimeoutError:
+            # proc.wait() returns only once the pipe closes, so kill every holder of it
+            _kill_process_group(proc)
+
+            async def reap():
+                await proc.stdout.read()  # EOF now that no process holds the pipe
+                await proc.wait()
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(reap(), 5)
             return f"Error: Command timed out after {timeout}s"
+        return _format_command_result(proc.returncode, output.text())
 
     def _tool_git_commit(self, message: str) -> str:
         try:
-            subprocess.run(["git", "add", "-A"], cwd=str(self.root), capture_output=True, timeout=10)
+            status = subprocess.run(
+                ["git", "status", "--porcelain=v1", "-z"], cwd=self._root_str, capture_output=True, timeout=10
+            )
+            if status.returncode == 0 and not status.stdout:
+                return "Git commit output: nothing to commit, working tree clean"
+            # Tracked edits only (the usual case): let commit -a stage them, skipping a full add -A
+            if status.returncode != 0 or _has_untracked(status.stdout):
+                subprocess.run(["git", "add", "-A"], cwd=self._root_str, capture_output=True, timeout=10)
             result = subprocess.run(
-                ["git", "commit", "-m", message],
-                cwd=str(self.root),
+                ["git", "commit", "-a", "-m", message],
+                cwd=self._root_str,
                 capture_output=True,
                 text=True,
                 timeout=15,
@@ -311,3 +819,15 @@ class ToolExecutor:
 
     def _tool_task_done(self, summary: str) -> str:
         return f"__TASK_DONE__:{summary}"
+
+    # Tool name -> handler; every tool in TOOLS_SCHEMA needs an entry here
+    _HANDLERS = {
+        "read_file": _tool_read_file,
+        "write_file": _tool_write_file,
+        "edit_file": _tool_edit_file,
+        "list_dir": _tool_list_dir,
+        "search_code": _tool_search_code,
+        "run_command": _tool_run_command,
+        "git_commit": _tool_git_commit,
+        "task_done": _tool_task_done,
+    }